@@ -1,109 +1,355 @@
 # core/file_router.py
 from __future__ import annotations
 
+import os
 import shutil
+import threading
+from concurrent.futures import Executor
 from pathlib import Path
-from typing import Any
+from typing import AbstractSet, Any, Iterable, List, Optional, Set, Tuple
+
+from .splitter import split_java
 
 
 JAVA_EXTENSIONS = {".java"}
 
+# .java крупнее этого режутся на куски и переводятся параллельно (chunk_executor)
+JAVA_CHUNK_CHARS = 20_000
+
+# каталоги, уже созданные за этот прогон: один mkdir на каталог, а не на файл
+_ensured_dirs: Set[Path] = set()
+_ensured_lock = threading.Lock()
+
+
+def _ensure_dir(d: Path) -> None:
+    if d in _ensured_dirs:
+        return
+    with _ensured_lock:
+        if d in _ensured_dirs:
+            return
+        d.mkdir(parents=True, exist_ok=True)
+        _ensured_dirs.add(d)
+
 
 def ensure_parent_dir(path: Path) -> None:
     """
     Ensure that parent directory exists.
     """
-    path.parent.mkdir(parents=True, exist_ok=True)
+    _ensure_dir(path.parent)
 
 
-def route_and_process_file(
+def ensure_output_dirs(dst_root: Path, rel_paths: Iterable[Path]) -> None:
+    """
+    Create all output directories up front, once per unique parent.
+    """
+    for d in sorted({(dst_root / p).parent for p in rel_paths}):
+        _ensure_dir(d)
+
+
+# поточный буфер чтения: растёт до размера самого большого .java и переиспользуется
+_tls = threading.local()
+_READ_POOL_MAX = 4 * 1024 * 1024  # файлы крупнее читаются в свежий буфер
+
+
+def _read_buffer(size: int) -> bytearray:
+    if size > _READ_POOL_MAX:
+        return bytearray(size)
+    buf = getattr(_tls, "read_buf", None)
+    if buf is None or len(buf) < size:
+        buf = bytearray(max(size, 64 * 1024))
+        _tls.read_buf = buf
+    return buf
+
+
+def read_utf8(path: Path) -> str:
+    """
+    Read a UTF-8 file into a reused per-thread buffer and decode it in place.
+
+    Без промежуточного bytes-объекта на каждый файл; CRLF сохраняется 1:1.
+    """
+    with open(path, "rb", buffering=0) as f:
+        size = os.fstat(f.fileno()).st_size
+        buf = _read_buffer(size)
+        with memoryview(buf) as view:
+            n = 0
+            while n < size:
+                r = f.readinto(view[n:size])
+                if not r:
+                    break
+                n += r
+            tail = f.read() if n == size else b""
+            if tail:
+                # файл вырос во время чтения
+                return (bytes(view[:n]) + tail).decode("utf-8")
+            return str(view[:n], "utf-8")
+
+
+def atomic_write_bytes(path: Path, payload: bytes) -> None:
+    """
+    Write payload to <path>.tmp via a single fd, then os.replace → path.
+    """
+    tmp_name = str(path) + ".tmp"
+    fd = os.open(tmp_name, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        view = memoryview(payload)
+        while view:
+            written = os.write(fd, view)
+            view = view[written:]
+    finally:
+        os.close(fd)
+    try:
+        os.replace(tmp_name, path)
+    except Exception:
+        os.unlink(tmp_name)
+        raise
+
+
+def fast_copy(src_path: Path, dst_path: Path) -> None:
+    """
+    Copy file contents in kernel space, then copy metadata (like shutil.copy2).
+
+    copy_file_range (Linux, может сделать reflink) → sendfile → copyfileobj.
+    """
+    with open(src_path, "rb") as fsrc, open(dst_path, "wb") as fdst:
+        sfd, dfd = fsrc.fileno(), fdst.fileno()
+        size = os.fstat(sfd).st_size
+        copied = 0
+
+        if hasattr(os, "copy_file_range"):
+            try:
+                while copied < size:
+                    n = os.copy_file_range(sfd, dfd, size - copied)
+                    if n == 0:
+                        break
+                    copied += n
+            except OSError:
+                # EXDEV/ENOSYS/EINVAL на старых ядрах и ФС — продолжаем ниже
+                pass
+
+        if copied < size and hasattr(os, "sendfile"):
+            try:
+                while copied < size:
+                    n = os.sendfile(dfd, sfd, copied, size - copied)
+                    if n == 0:
+                        break
+                    copied += n
+            except OSError:
+                pass
+
+        if copied < size:
+            fsrc.seek(copied)
+            fdst.seek(copied)
+            shutil.copyfileobj(fsrc, fdst)
+
+    shutil.copystat(src_path, dst_path)
+
+
+# служебные каталоги самого переводчика в dst_root (лог, глоссарий, кэш) —
+# создаются до скана и результатами перевода не являются
+_TOOL_DIRS = frozenset({"_translation_logs", "_translation_cache"})
+
+
+def scan_existing_outputs(dst_root: Path) -> Set[Path]:
+    """
+    Walk dst_root once (os.scandir) and return relative paths of existing files.
+
+    Used for RESUME instead of a stat() per file. Visited directories are
+    also remembered as already ensured, so they are never mkdir'ed again.
+    The tool's own top-level dirs (_TOOL_DIRS) are not scanned.
+    """
+    existing: Set[Path] = set()
+    if not dst_root.is_dir():
+        return existing
+
+    stack = [(dst_root, Path())]
+    while stack:
+        abs_dir, rel_dir = stack.pop()
+        try:
+            it = os.scandir(abs_dir)
+        except PermissionError:
+            # нечитаемый каталог пропускаем (как rglob), а не роняем прогон
+            continue
+        with _ensured_lock:
+            _ensured_dirs.add(abs_dir)
+        with it:
+            for entry in it:
+                if entry.is_dir(follow_symlinks=False):
+                    if rel_dir == Path() and entry.name in _TOOL_DIRS:
+                        continue
+                    stack.append((Path(entry.path), rel_dir / entry.name))
+                elif entry.is_file():
+                    existing.add(rel_dir / entry.name)
+    return existing
+
+
+def partition_files(rel_paths: Iterable[Path]) -> Tuple[List[Path], List[Path]]:
+    """
+    Split project files once: (java_files, passthrough_files).
+    """
+    java_files: List[Path] = []
+    other_files: List[Path] = []
+    for rel_path in rel_paths:
+        if rel_path.suffix.lower() in JAVA_EXTENSIONS:
+            java_files.append(rel_path)
+        else:
+            other_files.append(rel_path)
+    return java_files, other_files
+
+
+def _already_processed(
+    dst_path: Path,
+    rel_path: Path,
+    existing_outputs: Optional[AbstractSet[Path]],
+    stats: Any,
+    logger: Any,
+) -> bool:
+    # RESUME: если целевой файл уже существует — пропускаем.
+    # existing_outputs — заранее просканированный dst_root (без stat на файл)
+    if existing_outputs is not None:
+        exists = rel_path in existing_outputs
+    else:
+        exists = dst_path.exists()
+    if exists:
+        logger.info("[RESUME] Skip already processed file: %s", rel_path)
+        stats.record(outcome="skipped")
+        return True
+    return False
+
+
+def translate_java_file(
     src_root: Path,
     dst_root: Path,
     rel_path: Path,
     java_translator: Any,
     stats: Any,
     logger: Any,
+    existing_outputs: Optional[AbstractSet[Path]] = None,
+    chunk_executor: Optional[Executor] = None,
 ) -> None:
     """
-    Route a single file to the proper translation/copy logic and write result.
+    Translate a single .java file via JavaTranslator and write result.
 
-    For MVP:
-    - .java → JavaTranslator.translate(text, file_label=...)
-    - другие файлы → просто копируем (skip/RESUME)
+    Files larger than JAVA_CHUNK_CHARS are split with split_java() and the
+    chunks are translated concurrently on chunk_executor (if given). It must
+    be a different pool from the one running this function, otherwise
+    workers could block waiting on their own queued chunks.
 
     Atomic write:
-    - if src_size > 10 KB → write to tmp file and then os.replace
+    - encode once, write to tmp file and then os.replace (for any size)
     """
     src_path = src_root / rel_path
     dst_path = dst_root / rel_path
 
-    stats.total_files += 1
-
-    # RESUME: если целевой файл уже существует — пропускаем
-    if dst_path.exists():
-        logger.info(f"[RESUME] Skip already processed file: {rel_path}")
-        stats.skipped_files += 1
+    if _already_processed(dst_path, rel_path, existing_outputs, stats, logger):
         return
 
-    suffix = src_path.suffix.lower()
-
-    # --- Java files: use JavaTranslationAgent ---
-    if suffix in JAVA_EXTENSIONS:
-        try:
-            text = src_path.read_text(encoding="utf-8")
-        except Exception as e:
-            msg = f"[ERROR] Read failed: {src_path}: {e}"
-            logger.error(msg, exc_info=True)
-            stats.error_files += 1
-            stats.errors.append(msg)
-            return
+    try:
+        text = read_utf8(src_path)
+    except Exception as e:
+        msg = f"[ERROR] Read failed: {src_path}: {e}"
+        logger.error(msg, exc_info=True)
+        stats.record(outcome="error", error=msg)
+        return
 
-        logger.info(
-            f"[JAVA] Translating {rel_path} (len={len(text)} chars)"
+    try:
+        chunks = (
+            split_java(text, JAVA_CHUNK_CHARS)
+            if chunk_executor is not None
+            else [text]
         )
-
-        try:
+        if len(chunks) == 1:
             translated = java_translator.translate(
                 text=text,
                 file_label=str(rel_path),  # for logging / future heuristics
             )
-        except Exception as e:
-            msg = f"[ERROR] Translate {src_path}: {e}"
-            logger.error(msg, exc_info=True)
-            stats.error_files += 1
-            stats.errors.append(msg)
-            return
+        else:
+            futures = [
+                chunk_executor.submit(
+                    java_translator.translate,
+                    text=chunk,
+                    file_label=f"{rel_path}#{idx}",
+                )
+                for idx, chunk in enumerate(chunks)
+            ]
+            translated = "".join(f.result() for f in futures)
+    except Exception as e:
+        msg = f"[ERROR] Translate {src_path}: {e}"
+        logger.error(msg, exc_info=True)
+        stats.record(outcome="error", error=msg)
+        return
 
-        # атомарная запись для файлов > 10 KB
-        try:
-            ensure_parent_dir(dst_path)
-            if len(text) > 10_000:
-                tmp_path = dst_path.with_suffix(dst_path.suffix + ".tmp")
-                tmp_path.write_text(translated, encoding="utf-8")
-                tmp_path.replace(dst_path)
-            else:
-                dst_path.write_text(translated, encoding="utf-8")
-
-            stats.translated_files += 1
-            stats.total_input_chars += len(text)
-            stats.total_output_chars += len(translated)
-            stats.total_words += len(translated.split())
-        except Exception as e:
-            msg = f"[ERROR] Write failed: {dst_path}: {e}"
-            logger.error(msg, exc_info=True)
-            stats.error_files += 1
-            stats.errors.append(msg)
+    # атомарная запись: tmp + os.replace, без повторного кодирования
+    try:
+        ensure_parent_dir(dst_path)
+        atomic_write_bytes(dst_path, translated.encode("utf-8"))
+
+        # слова считает StringTranslator по ответам LLM; повторный подсчёт
+        # по всему файлу (вместе с кодом) давал двойной учёт
+        stats.record(
+            outcome="translated",
+            in_chars=len(text),
+            out_chars=len(translated),
+        )
+    except Exception as e:
+        msg = f"[ERROR] Write failed: {dst_path}: {e}"
+        logger.error(msg, exc_info=True)
+        stats.record(outcome="error", error=msg)
+
+
+def copy_passthrough_file(
+    src_root: Path,
+    dst_root: Path,
+    rel_path: Path,
+    stats: Any,
+    logger: Any,
+    existing_outputs: Optional[AbstractSet[Path]] = None,
+) -> None:
+    """
+    Copy a non-translated file as-is (MVP: everything except .java).
+    """
+    src_path = src_root / rel_path
+    dst_path = dst_root / rel_path
 
+    if _already_processed(dst_path, rel_path, existing_outputs, stats, logger):
         return
 
-    # --- Non-Java: just copy (MVP) ---
     try:
         ensure_parent_dir(dst_path)
-        shutil.copy2(src_path, dst_path)
-        logger.info(f"[COPY] {rel_path}")
-        stats.skipped_files += 1
+        fast_copy(src_path, dst_path)
+        logger.info("[COPY] %s", rel_path)
+        stats.record(outcome="skipped")
     except Exception as e:
         msg = f"[ERROR] Copy {src_path} -> {dst_path}: {e}"
         logger.error(msg, exc_info=True)
-        stats.error_files += 1
-        stats.errors.append(msg)
+        stats.record(outcome="error", error=msg)
+
+
+def route_and_process_file(
+    src_root: Path,
+    dst_root: Path,
+    rel_path: Path,
+    java_translator: Any,
+    stats: Any,
+    logger: Any,
+    existing_outputs: Optional[AbstractSet[Path]] = None,
+) -> None:
+    """
+    Route a single file to the proper translation/copy logic and write result.
+
+    For MVP:
+    - .java → translate_java_file (JavaTranslator.translate)
+    - другие файлы → copy_passthrough_file (skip/RESUME)
+
+    translate_project делит список файлов заранее (partition_files) и
+    вызывает специализированные функции напрямую; этот диспетчер — для
+    одиночных вызовов.
+    """
+    if rel_path.suffix.lower() in JAVA_EXTENSIONS:
+        translate_java_file(
+            src_root, dst_root, rel_path, java_translator, stats, logger,
+            existing_outputs,
+        )
+    else:
+        copy_passthrough_file(
+            src_root, dst_root, rel_path, stats, logger, existing_outputs
+        )
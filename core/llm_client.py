@@ -3,19 +3,144 @@ from __future__ import annotations
 
 import time
 import logging
-from dataclasses import dataclass
-from typing import Tuple, Dict, Any
+import threading
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Tuple, Dict, Any, List, Optional
 
-import requests  # type: ignore
+try:
+    import orjson  # type: ignore
+
+    _json_dumps = orjson.dumps
+    _json_loads = orjson.loads
+except ImportError:  # orjson — ускорение, не обязательная зависимость
+    import json
+
+    def _json_dumps(obj: Any) -> bytes:
+        return json.dumps(obj, ensure_ascii=False).encode("utf-8")
+
+    _json_loads = json.loads  # принимает и bytes
 
 from .errors import ExceedContextSizeError
 
+if TYPE_CHECKING:
+    # requests тянет urllib3/charset_normalizer (~50 мс) — импортируем лениво
+    # в _build_session, чтобы `--help` и импорт модуля были быстрыми
+    import requests  # type: ignore
+
 logger = logging.getLogger("translator.llm")
 
 
+def _build_session(url: str, pool_size: int) -> requests.Session:
+    """
+    Session с keep-alive: одно TCP-соединение на воркер вместо нового на каждый вызов.
+    pool_size — соединений в пуле на единственный хост LLM-сервера; клиент
+    сам не пускает больше pool_size запросов разом (--max-parallel-requests).
+    """
+    import requests  # type: ignore
+    from requests.adapters import HTTPAdapter  # type: ignore
+    from urllib3.util.retry import Retry  # type: ignore
+
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        # pool_connections — число кэшируемых пулов (по хосту); хост один,
+        # а параллельность задаёт pool_maxsize
+        pool_connections=1,
+        pool_maxsize=pool_size,
+        # повторяем только ответы 502/503/504 и неудачный connect (запрос до
+        # сервера не дошёл). Обрыв/таймаут чтения не повторяем: генерация уже
+        # шла, повтор занял бы ещё один слот сервера и до timeout времени
+        max_retries=Retry(
+            total=3,
+            connect=1,
+            read=0,
+            other=0,
+            backoff_factor=0.2,
+            status_forcelist=[502, 503, 504],
+            allowed_methods=frozenset({"POST"}),
+            raise_on_status=False,
+        ),
+    )
+    session.mount(url, adapter)
+    session.headers["Connection"] = "keep-alive"
+    # тело запроса сериализуем сами (_json_dumps) и шлём как data=
+    session.headers["Content-Type"] = "application/json"
+    return session
+
+
+def _collect_llama_stream(resp: requests.Response) -> str:
+    """
+    Собирает content из SSE-потока /v1/chat/completions (stream=true).
+    """
+    parts: List[str] = []
+    for line in resp.iter_lines():
+        if not line:
+            continue
+        if line.startswith(b"error:"):
+            line = b"data:" + line[6:]
+        if not line.startswith(b"data:"):
+            continue
+        data = line[5:].strip()
+        if data == b"[DONE]":
+            break
+        if (
+            b"exceed_context_size_error" in data
+            or b"exceeds the available context size" in data
+        ):
+            raise ExceedContextSizeError(
+                f"llama.cpp context exceeded: {data[:400].decode('utf-8', 'replace')}"
+            )
+        try:
+            chunk = _json_loads(data)
+        except Exception as e:
+            raise RuntimeError(
+                f"Unexpected llama.cpp stream chunk: {e}, chunk={data[:400]!r}"
+            )
+        if "error" in chunk:
+            raise RuntimeError(f"llama.cpp stream error: {chunk['error']}")
+        choices = chunk.get("choices") or []
+        if choices:
+            piece = (choices[0].get("delta") or {}).get("content")
+            if piece:
+                parts.append(piece)
+    return "".join(parts)
+
+
+def _collect_ollama_stream(resp: requests.Response) -> str:
+    """
+    Собирает response из NDJSON-потока /api/generate (stream=true).
+    """
+    parts: List[str] = []
+    for line in resp.iter_lines():
+        if not line:
+            continue
+        try:
+            chunk = _json_loads(line)
+        except Exception as e:
+            raise RuntimeError(
+                f"Unexpected Ollama stream chunk: {e}, chunk={line[:400]!r}"
+            )
+        if "error" in chunk:
+            raise RuntimeError(f"Ollama stream error: {chunk['error']}")
+        piece = chunk.get("response")
+        if piece:
+            parts.append(piece)
+        if chunk.get("done"):
+            break
+    return "".join(parts)
+
+
 @dataclass
 class BaseLLMClient:
-    def translate(self, system_prompt: str, user_prompt: str) -> Tuple[str, float]:
+    def translate(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        stop: Optional[List[str]] = None,
+    ) -> Tuple[str, float]:
+        """
+        stop — стоп-последовательности: генерация обрывается на них
+        (меньше лишних токенов), сама последовательность в ответ не входит.
+        """
         raise NotImplementedError
 
 
@@ -24,8 +149,20 @@ class LlamaCppClient(BaseLLMClient):
     url: str
     model: str
     timeout: int = 60  # меньше, чтобы не висело на минутами
+    pool_size: int = 4  # не больше стольких запросов к серверу одновременно
+    stream: bool = True  # читать ответ потоком (SSE), а не ждать всё тело
+    session: requests.Session = field(init=False, repr=False)
 
-    def translate(self, system_prompt: str, user_prompt: str) -> Tuple[str, float]:
+    def __post_init__(self) -> None:
+        self.session = _build_session(self.url, self.pool_size)
+        self._slots = threading.BoundedSemaphore(self.pool_size)
+
+    def translate(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        stop: Optional[List[str]] = None,
+    ) -> Tuple[str, float]:
         payload: Dict[str, Any] = {
             "model": self.model,
             "messages": [
@@ -33,42 +170,59 @@ class LlamaCppClient(BaseLLMClient):
                 {"role": "user", "content": user_prompt},
             ],
             "temperature": 0.0,
+            "stream": self.stream,
         }
+        if stop:
+            payload["stop"] = stop
 
         logger.info(
-            f"[LLM] llama.cpp call → {self.url} model={self.model}, "
-            f"user_prompt_len={len(user_prompt)}"
+            "[LLM] llama.cpp call → %s model=%s, user_prompt_len=%d",
+            self.url, self.model, len(user_prompt),
         )
 
-        t0 = time.time()
-        resp = requests.post(self.url, json=payload, timeout=self.timeout)
-        t1 = time.time()
+        # слот сервера: воркеров может быть больше, чем параллельных слотов
+        # llama.cpp/Ollama; ожидание слота в LLM time не входит
+        with self._slots:
+            t0 = time.time()
+            content = ""
+            with self.session.post(
+                self.url,
+                data=_json_dumps(payload),
+                timeout=self.timeout,
+                stream=self.stream,
+            ) as resp:
+                if resp.status_code == 200 and self.stream:
+                    content = _collect_llama_stream(resp)
+                    body = b""
+                else:
+                    body = resp.content
+            t1 = time.time()
 
         dt = t1 - t0
-        text_body = resp.text
 
-        logger.info(f"[LLM] llama.cpp response HTTP {resp.status_code} in {dt:.2f}s")
+        logger.info("[LLM] llama.cpp response HTTP %d in %.2fs", resp.status_code, dt)
 
         if resp.status_code == 400 and (
-            "exceed_context_size_error" in text_body
-            or "exceeds the available context size" in text_body
+            b"exceed_context_size_error" in body
+            or b"exceeds the available context size" in body
         ):
             raise ExceedContextSizeError(
-                f"llama.cpp context exceeded: {text_body[:400]}"
+                f"llama.cpp context exceeded: {resp.text[:400]}"
             )
 
         if resp.status_code != 200:
             raise RuntimeError(
-                f"llama.cpp error HTTP {resp.status_code}: {text_body[:400]}"
+                f"llama.cpp error HTTP {resp.status_code}: {resp.text[:400]}"
             )
 
-        data = resp.json()
-        try:
-            content = data["choices"][0]["message"]["content"]
-        except Exception as e:
-            raise RuntimeError(
-                f"Unexpected llama.cpp response format: {e}, body={data}"
-            )
+        if not self.stream:
+            try:
+                data = _json_loads(body)
+                content = data["choices"][0]["message"]["content"]
+            except Exception as e:
+                raise RuntimeError(
+                    f"Unexpected llama.cpp response format: {e}, body={body[:400]!r}"
+                )
 
         return content, dt
 
@@ -79,8 +233,20 @@ class OllamaClient(BaseLLMClient):
     model: str
     timeout: int = 60
     options: Dict[str, Any] | None = None
+    pool_size: int = 4  # не больше стольких запросов к серверу одновременно
+    stream: bool = True  # читать ответ потоком (NDJSON), а не ждать всё тело
+    session: requests.Session = field(init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        self.session = _build_session(self.url, self.pool_size)
+        self._slots = threading.BoundedSemaphore(self.pool_size)
 
-    def translate(self, system_prompt: str, user_prompt: str) -> Tuple[str, float]:
+    def translate(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        stop: Optional[List[str]] = None,
+    ) -> Tuple[str, float]:
         prompt = f"System:\n{system_prompt}\n\nUser:\n{user_prompt}\n\nAssistant:"
         payload: Dict[str, Any] = {
             "model": self.model,
@@ -89,32 +255,49 @@ class OllamaClient(BaseLLMClient):
                 "temperature": 0.0,
                 **(self.options or {}),
             },
-            "stream": False,
+            "stream": self.stream,
         }
+        if stop:
+            payload["options"]["stop"] = stop
 
         logger.info(
-            f"[LLM] Ollama call → {self.url} model={self.model}, "
-            f"user_prompt_len={len(user_prompt)}"
+            "[LLM] Ollama call → %s model=%s, user_prompt_len=%d",
+            self.url, self.model, len(user_prompt),
         )
 
-        t0 = time.time()
-        resp = requests.post(self.url, json=payload, timeout=self.timeout)
-        t1 = time.time()
+        # слот сервера: воркеров может быть больше, чем параллельных слотов
+        # llama.cpp/Ollama; ожидание слота в LLM time не входит
+        with self._slots:
+            t0 = time.time()
+            content = ""
+            with self.session.post(
+                self.url,
+                data=_json_dumps(payload),
+                timeout=self.timeout,
+                stream=self.stream,
+            ) as resp:
+                if resp.status_code == 200 and self.stream:
+                    content = _collect_ollama_stream(resp)
+                    body = b""
+                else:
+                    body = resp.content
+            t1 = time.time()
 
         dt = t1 - t0
-        logger.info(f"[LLM] Ollama response HTTP {resp.status_code} in {dt:.2f}s")
+        logger.info("[LLM] Ollama response HTTP %d in %.2fs", resp.status_code, dt)
 
         if resp.status_code != 200:
             raise RuntimeError(
                 f"Ollama error HTTP {resp.status_code}: {resp.text[:400]}"
             )
 
-        data = resp.json()
-        try:
-            content = data.get("response", "")
-        except Exception as e:
-            raise RuntimeError(
-                f"Unexpected Ollama response format: {e}, body={data}"
-            )
+        if not self.stream:
+            try:
+                data = _json_loads(body)
+                content = data.get("response", "")
+            except Exception as e:
+                raise RuntimeError(
+                    f"Unexpected Ollama response format: {e}, body={body[:400]!r}"
+                )
 
         return content, dt
@@ -1,7 +1,10 @@
 # core/logging_setup.py
 from __future__ import annotations
 
+import atexit
 import logging
+import logging.handlers
+import queue
 import sys
 from pathlib import Path
 
@@ -34,12 +37,18 @@ def setup_logger(output_root: Path) -> logging.Logger:
     # Консоль
     ch = logging.StreamHandler(sys.stdout)
     ch.setFormatter(fmt)
-    logger.addHandler(ch)
 
     # Файл
     fh = logging.FileHandler(log_path, encoding="utf-8")
     fh.setFormatter(fmt)
-    logger.addHandler(fh)
+
+    # Воркеры только кладут запись в очередь; в консоль и файл пишет
+    # отдельный поток QueueListener, чтобы не блокировать вызовы LLM на IO
+    log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+    logger.addHandler(logging.handlers.QueueHandler(log_queue))
+    listener = logging.handlers.QueueListener(log_queue, ch, fh)
+    listener.start()
+    atexit.register(listener.stop)
 
     logger.info(f"Logging to {log_path}")
     return logger
@@ -0,0 +1,111 @@
+# core/splitter.py
+from __future__ import annotations
+
+import re
+from typing import List
+
+# Те же правила, что в java_translator (core не импортирует верхний уровень):
+# код пропускаем до следующего интересного символа, тело литерала —
+# одним regex с парами \x.
+_CODE_STOP = re.compile(r"[\"'/{}\n]")
+_STRING_BODY = re.compile(r'[^"\\]*(?:\\.[^"\\]*)*"', re.S)
+_CHAR_BODY = re.compile(r"[^'\\]*(?:\\.[^'\\]*)*'", re.S)
+
+
+def split_java(src: str, max_chars: int) -> List[str]:
+    """
+    Режет Java-исходник на куски ~max_chars для параллельного перевода.
+
+    Резать можно только на конце строки, где лексер JavaTranslator находится
+    в обычном коде (не внутри строки/char-литерала/комментария) и глубина
+    фигурных скобок <= 1 (между членами top-level класса). Состояния повторяют
+    JavaTranslator.translate один в один, поэтому перевод кусков по отдельности
+    даёт тот же результат, что и перевод файла целиком.
+
+    "".join(split_java(src, n)) == src всегда.
+    """
+    n = len(src)
+    if n <= max_chars:
+        return [src]
+
+    NORMAL = 0
+    LINE_COMMENT = 3
+    BLOCK_COMMENT = 4
+
+    mode = NORMAL
+    depth = 0
+
+    chunks: List[str] = []
+    chunk_start = 0
+    last_cut = 0  # последняя допустимая точка разреза после chunk_start
+
+    def take(end: int) -> None:
+        # режем, как только кусок дорос до max_chars и есть точка разреза
+        nonlocal chunk_start
+        if end - chunk_start >= max_chars and last_cut > chunk_start:
+            chunks.append(src[chunk_start:last_cut])
+            chunk_start = last_cut
+
+    i = 0
+    while i < n:
+        if mode == NORMAL:
+            # код между интересными символами пропускаем одним поиском
+            m = _CODE_STOP.search(src, i)
+            if m is None:
+                i = n
+                take(i)
+                break
+            i = m.start()
+            ch = src[i]
+
+            if ch == '"' or ch == "'":
+                body = _STRING_BODY if ch == '"' else _CHAR_BODY
+                m = body.match(src, i + 1)
+                if m is None:
+                    # незакрытый литерал — дальше резать нельзя
+                    i = n
+                    take(i)
+                    break
+                i = m.end()
+            elif ch == "/" and i + 1 < n and src[i + 1] == "/":
+                mode = LINE_COMMENT
+                i += 2
+            elif ch == "/" and i + 1 < n and src[i + 1] == "*":
+                mode = BLOCK_COMMENT
+                i += 2
+                # Javadoc /** – лишняя * относится к разделителю
+                if i < n and src[i] == "*":
+                    i += 1
+            else:
+                if ch == "{":
+                    depth += 1
+                elif ch == "}":
+                    depth = max(0, depth - 1)
+                elif ch == "\n" and depth <= 1:
+                    last_cut = i + 1
+                i += 1
+
+        elif mode == LINE_COMMENT:
+            j = src.find("\n", i)
+            if j == -1:
+                i = n
+                take(i)
+                break
+            mode = NORMAL
+            i = j + 1
+            if depth <= 1:
+                last_cut = i
+
+        else:  # BLOCK_COMMENT
+            j = src.find("*/", i)
+            if j == -1:
+                i = n
+                take(i)
+                break
+            mode = NORMAL
+            i = j + 2
+
+        take(i)
+
+    chunks.append(src[chunk_start:])
+    return chunks
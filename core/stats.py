@@ -1,11 +1,22 @@
 # core/stats.py
 from __future__ import annotations
 from dataclasses import dataclass, field
-from typing import List
+from typing import List, Optional
 import logging
+import threading
 
 
-@dataclass
+def count_words(text: str) -> int:
+    """
+    Приблизительное число слов.
+
+    str.split() здесь быстрее regex (\\S+ через findall/finditer в 4–8 раз
+    медленнее на CPython), поэтому оставляем его, но в одном месте.
+    """
+    return len(text.split())
+
+
+@dataclass(slots=True)
 class Stats:
     total_files: int = 0
     translated_files: int = 0
@@ -19,6 +30,42 @@ class Stats:
     llm_time_seconds: float = 0.0
     errors: List[str] = field(default_factory=list)
 
+    _lock: threading.Lock = field(
+        default_factory=threading.Lock, repr=False, compare=False
+    )
+
+    def record(
+        self,
+        *,
+        outcome: Optional[str] = None,
+        in_chars: int = 0,
+        out_chars: int = 0,
+        words: int = 0,
+        llm_dt: float = 0.0,
+        error: Optional[str] = None,
+    ) -> None:
+        """
+        Одно обновление счётчиков под одной блокировкой.
+
+        outcome: "translated" | "skipped" | "error" — итог обработки файла
+        (увеличивает total_files); None — только счётчики LLM/слов.
+        """
+        with self._lock:
+            if outcome is not None:
+                self.total_files += 1
+                if outcome == "translated":
+                    self.translated_files += 1
+                elif outcome == "skipped":
+                    self.skipped_files += 1
+                elif outcome == "error":
+                    self.error_files += 1
+            self.total_input_chars += in_chars
+            self.total_output_chars += out_chars
+            self.total_words += words
+            self.llm_time_seconds += llm_dt
+            if error is not None:
+                self.errors.append(error)
+
     def log_summary(self, logger: logging.Logger, wall_time: float) -> None:
         logger.info("-------------- TRANSLATION SUMMARY --------------")
         logger.info(f"Total files:          {self.total_files}")
@@ -1,17 +1,166 @@
 # core/string_translator.py
 from __future__ import annotations
 
+from concurrent.futures import Executor, as_completed
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Dict
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
 
+import atexit
 import logging
+import os
+import queue
+import re
+import threading
 
+from .errors import ExceedContextSizeError
 from .llm_client import BaseLLMClient
-from .stats import Stats
+from .stats import Stats, count_words
+from .translation_cache import TranslationCache
 
 logger = logging.getLogger("translator.strings")
 
+_SINGLE_LINE_STOP = ["\n\n"]
+
+# Пакет для translate_many: не больше стольких строк / символов на один запрос.
+# ~2k символов входа + столько же ответа влезают в контекст локальной модели;
+# короткие UI-строки упираются в BATCH_MAX_ITEMS, длинные комменты — в символы.
+BATCH_MAX_ITEMS = 20
+BATCH_MAX_CHARS = 2000
+
+# Управляющие символы, ломающие строку TSV. Большинство пар их не содержит —
+# тогда строка идёт как есть, без копий. str.translate с таблицей на
+# многосимвольные замены в CPython идёт медленным путём (в ~20 раз медленнее
+# цепочки replace), поэтому не он.
+_TSV_SPECIAL = re.compile(r"[\t\n\r]")
+
+
+def _tsv_escape(s: str) -> str:
+    if _TSV_SPECIAL.search(s) is None:
+        return s
+    return s.replace("\n", "\\n").replace("\r", "\\r").replace("\t", "\\t")
+
+
+# строка-маркер сегмента в пакетном ответе: [[N]]
+_BATCH_MARKER = re.compile(r"^[ \t]*\[\[(\d+)\]\][ \t]*\r?\n?", re.M)
+
+
+def _clean_answer(translated: str) -> str:
+    t = translated.strip()
+    # Часто модели зачем-то оборачивают в кавычки — снимем
+    q = t[:1]
+    if q in ('"', "'") and t[-1:] == q:
+        t = t[1:-1].strip()
+    return t
+
+
+# Что остаётся от строки без escape-последовательностей и форматных
+# плейсхолдеров: \n, \t, %s, %-10d, %.2f, {0}, {}. \uXXXX не трогаем:
+# так в старых исходниках бывает записан сам текст (кириллица).
+_NON_TEXT_TOKEN = re.compile(
+    r"\\[^u]|%[-#+ 0,(]*\d*(?:\.\d+)?[a-zA-Z]|\{\d*\}", re.S
+)
+# буква любого алфавита (не цифра и не _)
+_LETTER = re.compile(r"[^\W\d_]")
+# длиннее этого строка почти наверняка содержит текст — не проверяем
+_PRECHECK_MAX_CHARS = 64
+
+
+def _needs_llm(core: str) -> bool:
+    """
+    Есть ли в строке что переводить. "{0}", "%d: %s", "\\n", ", ", "42" —
+    нет: отдаём как есть, без хэширования в кэше и без запроса к LLM.
+    """
+    if len(core) >= _PRECHECK_MAX_CHARS:
+        return True
+    return _LETTER.search(_NON_TEXT_TOKEN.sub("", core)) is not None
+
+
+# Письменность языка по коду (ru, ru-RU, zh_CN). Кода нет в таблице —
+# письменность неизвестна (ko, ar, el, he, ...), и шорткат выключается
+_LANG_SCRIPT = {
+    "en": "latin",
+    "de": "latin",
+    "fr": "latin",
+    "es": "latin",
+    "it": "latin",
+    "pt": "latin",
+    "nl": "latin",
+    "pl": "latin",
+    "cs": "latin",
+    "tr": "latin",
+    "ru": "cyrillic",
+    "uk": "cyrillic",
+    "be": "cyrillic",
+    "bg": "cyrillic",
+    "sr": "cyrillic",
+    "mk": "cyrillic",
+    "kk": "cyrillic",
+    "zh": "cjk",
+    "ja": "cjk",
+}
+# буквы каждой письменности; латиница — с диакритикой (tr, de, fr, ...)
+_SCRIPT_LETTERS = {
+    "latin": re.compile("[A-Za-z\u00C0-\u024F]"),
+    "cyrillic": re.compile("[\u0400-\u04FF]"),
+    "cjk": re.compile("[\u3040-\u30FF\u4E00-\u9FFF]"),
+}
+# Java-экранирование \uXXXX (допускается и \uuXXXX): так бывает записан сам текст
+_U_ESCAPE = re.compile(r"\\u+([0-9a-fA-F]{4})")
+# строка "уже на целевом языке", если на его письменность приходится
+# не меньше этой доли букв: одно русское имя в английском комменте
+# (или английский термин в русском) решение не переворачивает
+_SCRIPT_SHARE = 0.9
+
+
+def _lang_script(lang: str) -> Optional[str]:
+    return _LANG_SCRIPT.get(re.split(r"[-_]", lang.lower(), 1)[0])
+
+
+def _in_script(core: str, script: str) -> bool:
+    """
+    Грубая проверка письменности по диапазонам Unicode: доля букв script
+    среди всех букв строки. Плейсхолдеры и escape-последовательности не
+    считаются, \\uXXXX сначала раскрываются в символы.
+    """
+    text = _U_ESCAPE.sub(
+        lambda m: chr(int(m.group(1), 16)), _NON_TEXT_TOKEN.sub("", core)
+    )
+    letters = len(_LETTER.findall(text))
+    if not letters:
+        return False
+    return len(_SCRIPT_LETTERS[script].findall(text)) >= _SCRIPT_SHARE * letters
+
+
+def _make_batches(texts: List[str]) -> Iterator[List[str]]:
+    """Режет список на пакеты по BATCH_MAX_ITEMS строк / BATCH_MAX_CHARS символов."""
+    batch: List[str] = []
+    size = 0
+    for s in texts:
+        if batch and (
+            len(batch) >= BATCH_MAX_ITEMS or size + len(s) > BATCH_MAX_CHARS
+        ):
+            yield batch
+            batch, size = [], 0
+        batch.append(s)
+        size += len(s)
+    if batch:
+        yield batch
+
+
+def _split_outer_ws(s: str) -> Tuple[str, str, str]:
+    """
+    (ведущие пробелы, ядро, хвостовые пробелы). В LLM и кэш идёт только ядро:
+    " Save", "Save " и "\n * Save\n " — одна запись кэша, а исходная
+    обвязка (отступ Javadoc, пробел после //) возвращается на место —
+    _clean_answer её всё равно срезал бы с ответа.
+    """
+    core = s.strip()
+    if not core:
+        return s, "", ""
+    lead = len(s) - len(s.lstrip())
+    return s[:lead], core, s[lead + len(core):]
+
 
 @dataclass
 class StringTranslator:
@@ -22,6 +171,8 @@ class StringTranslator:
         translate(text: str) -> str   # для целого файла .txt/.md
     Плюс:
         translate_string(s: str) -> str  # для Java-комментариев и строковых литералов
+        translate_many(texts: list[str]) -> list[str]  # все атомы файла пакетами
+        warm_cache(texts, executor) -> int  # прогрев кэша строками всего проекта
     """
 
     client: BaseLLMClient
@@ -29,10 +180,31 @@ class StringTranslator:
     target_lang: str
     stats: Stats
     glossary_path: Path
+    cache_path: Optional[Path] = None  # sqlite-кэш между прогонами; None — только память
+    lang_shortcut: bool = True  # строки уже на целевом языке — без LLM
 
     def __post_init__(self) -> None:
-        self._cache: Dict[str, str] = {}
         self._system_prompt = self._build_system_prompt()
+        # ru -> en: строка почти целиком латиницей уже не на исходном языке,
+        # переводить нечего (английские сообщения об ошибках в русском
+        # проекте). Работает, только если письменности обоих языков известны
+        # и различаются.
+        src_script = _lang_script(self.source_lang)
+        tgt_script = _lang_script(self.target_lang)
+        self._target_script: Optional[str] = None
+        if (
+            self.lang_shortcut
+            and src_script is not None
+            and tgt_script is not None
+            and src_script != tgt_script
+        ):
+            self._target_script = tgt_script
+        # кэш общий для всех воркеров ThreadPoolExecutor (потокобезопасный);
+        # модель входит в ключ: перевод другой модели — не попадание
+        model = getattr(self.client, "model", "")
+        self._cache = TranslationCache(
+            path=self.cache_path, namespace=f"{model}\0{self._system_prompt}"
+        )
 
         self.glossary_path.parent.mkdir(parents=True, exist_ok=True)
         if not self.glossary_path.exists():
@@ -40,6 +212,30 @@ class StringTranslator:
                 "# original\ttranslation\n", encoding="utf-8"
             )
 
+        # Глоссарий пишет отдельный поток: воркеры только кладут строку в
+        # очередь и не ждут диска. Поток забирает всё накопившееся и пишет
+        # одним os.write в дескриптор с O_APPEND. Сброс — в close() (и через
+        # atexit); глоссарий — подсказки, потеря хвоста при падении не страшна
+        self._glossary_fd = os.open(
+            self.glossary_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644
+        )
+        self._glossary_q: "queue.SimpleQueue[Optional[str]]" = queue.SimpleQueue()
+        self._glossary_thread = threading.Thread(
+            target=self._glossary_writer, name="glossary", daemon=True
+        )
+        self._glossary_thread.start()
+        self._close_lock = threading.Lock()
+        self._closed = False
+        atexit.register(self.close)
+
+    def _wants_llm(self, core: str) -> bool:
+        """_needs_llm + строка ещё не на целевом языке (см. lang_shortcut)."""
+        if not _needs_llm(core):
+            return False
+        return self._target_script is None or not _in_script(
+            core, self._target_script
+        )
+
     # -------- PROMPT --------
 
     def _build_system_prompt(self) -> str:
@@ -60,45 +256,194 @@ class StringTranslator:
 
     def _call_llm(self, text: str) -> str:
         user_prompt = f"Text to translate:\n{text}\n\nTranslation:"
-        translated, dt = self.client.translate(self._system_prompt, user_prompt)
+        # Однострочный текст: обрываем генерацию на пустой строке, чтобы модель
+        # не дописывала пояснения. Многострочные комменты (Javadoc с абзацами)
+        # так резать нельзя.
+        stop = _SINGLE_LINE_STOP if "\n" not in text else None
+        translated, dt = self.client.translate(
+            self._system_prompt, user_prompt, stop=stop
+        )
+        if stop and not translated.strip():
+            # модель начала ответ с пустой строки и сразу упёрлась в stop
+            translated, dt2 = self.client.translate(self._system_prompt, user_prompt)
+            dt += dt2
 
-        self.stats.llm_time_seconds += dt
-        self.stats.total_words += len(translated.split())
+        self.stats.record(llm_dt=dt, words=count_words(translated))
+        return _clean_answer(translated)
 
-        t = translated.strip()
-        # Часто модели зачем-то оборачивают в кавычки — снимем
-        if (t.startswith('"') and t.endswith('"')) or (
-            t.startswith("'") and t.endswith("'")
-        ):
-            t = t[1:-1].strip()
-        return t
+    def _call_llm_batch(self, texts: List[str]) -> Optional[List[str]]:
+        """
+        Один запрос на несколько строк. Сегменты разделены маркерами [[N]]
+        на отдельной строке — многострочные комменты формат не ломают.
+
+        None — ответ не разобрался (модель потеряла/склеила маркеры или
+        оставила сегмент пустым); тогда вызывающий переводит эти строки по
+        одной. Пустой перевод в кэш попадать не должен: sqlite-кэш хранит его
+        между прогонами, и литерал так и остался бы стёртым.
+        """
+        body = "\n".join(
+            f"[[{i}]]\n{text}" for i, text in enumerate(texts, 1)
+        )
+        user_prompt = (
+            f"Translate each of the {len(texts)} segments below separately.\n"
+            "Keep every marker line [[N]] exactly as is and in the same order; "
+            "after each marker write only the translation of that segment.\n\n"
+            f"{body}\n\nTranslation:"
+        )
+        translated, dt = self.client.translate(self._system_prompt, user_prompt)
+        # время считаем всегда, слова — только принятых сегментов (без маркеров
+        # [[N]]; отвергнутый ответ посчитают запросы по одной строке)
+        self.stats.record(llm_dt=dt)
+
+        parts = _BATCH_MARKER.split(translated)
+        # parts = [преамбула, "1", сегмент, "2", сегмент, ...]
+        if len(parts) != 2 * len(texts) + 1 or parts[0].strip():
+            return None
+        out: List[str] = []
+        for i in range(len(texts)):
+            if parts[2 * i + 1] != str(i + 1):
+                return None
+            t = _clean_answer(parts[2 * i + 2])
+            if not t:
+                return None
+            out.append(t)
+        self.stats.record(words=sum(count_words(t) for t in out))
+        return out
 
     def _log_glossary_pair(self, src: str, dst: str) -> None:
+        self._glossary_q.put(f"{_tsv_escape(src)}\t{_tsv_escape(dst)}\n")
+
+    def _glossary_writer(self) -> None:
+        """Поток записи глоссария; None в очереди — сигнал остановки."""
+        q = self._glossary_q
+        stop = False
         try:
-            with self.glossary_path.open("a", encoding="utf-8") as f:
-                f.write(
-                    src.replace("\n", "\\n")
-                    + "\t"
-                    + dst.replace("\n", "\\n")
-                    + "\n"
-                )
-        except Exception:
-            # глоссарий не должен ломать пайплайн
-            pass
+            while not stop:
+                lines = [q.get()]
+                while True:
+                    try:
+                        lines.append(q.get_nowait())
+                    except queue.Empty:
+                        break
+                stop = None in lines
+                data = "".join(line for line in lines if line is not None)
+                try:
+                    # одиночный суррогат из ответа LLM не должен убить поток
+                    view = memoryview(data.encode("utf-8", errors="replace"))
+                    while view:
+                        view = view[os.write(self._glossary_fd, view):]
+                except Exception as e:
+                    # глоссарий не должен ломать пайплайн
+                    logger.warning("[GLOSSARY] Write failed: %s", e)
+        finally:
+            os.close(self._glossary_fd)
+
+    def close(self) -> None:
+        """Дописывает и закрывает глоссарий, закрывает кэш (идемпотентно)."""
+        with self._close_lock:
+            if self._closed:
+                return
+            self._closed = True
+        self._glossary_q.put(None)
+        self._glossary_thread.join()
+        self._cache.close()
 
     # -------- PUBLIC API --------
 
     def translate_string(self, s: str) -> str:
         """Перевод одной строки (используется JavaTranslator)."""
-        if not s:
+        lead, core, trail = _split_outer_ws(s)
+        if not core or not self._wants_llm(core):
             return s
-        if s in self._cache:
-            return self._cache[s]
+        cached = self._cache.get(core)
+        if cached is not None:
+            return lead + cached + trail
+
+        # LLM вызываем вне блокировки кэша, чтобы не сериализовать воркеры
+        t = self._call_llm(core)
+        self._cache.put(core, t)
+        self._log_glossary_pair(core, t)
+        return lead + t + trail
+
+    def translate_many(self, texts: List[str]) -> List[str]:
+        """
+        Перевод списка строк: повторы (с точностью до внешних пробелов) и
+        попадания в кэш — без LLM, остальное — пакетами по BATCH_MAX_ITEMS /
+        BATCH_MAX_CHARS в одном запросе.
+        Пакет, ответ на который не разобрался, переводится по одной строке.
+        """
+        split = [_split_outer_ws(s) for s in texts]
+        done: Dict[str, str] = {"": ""}
+        pending: List[str] = []
+        for _lead, core, _trail in split:
+            if core in done:
+                continue
+            if not self._wants_llm(core):
+                done[core] = core
+                continue
+            cached = self._cache.get(core)
+            if cached is not None:
+                done[core] = cached
+            else:
+                done[core] = core  # заглушка до ответа LLM, держит дедупликацию
+                pending.append(core)
+
+        for batch in _make_batches(pending):
+            self._translate_batch(batch, done)
 
-        t = self._call_llm(s)
-        self._cache[s] = t
-        self._log_glossary_pair(s, t)
-        return t
+        return [lead + done[core] + trail for lead, core, trail in split]
+
+    def warm_cache(self, texts: Iterable[str], executor: Executor) -> int:
+        """
+        Прогрев кэша перед обработкой файлов: уникальные строки всего проекта
+        (повтор "OK"/"Cancel" в сотне файлов — один раз), полные пакеты
+        параллельно на executor. Возвращает число строк, ушедших в LLM.
+
+        Ошибки не пробрасываются: непереведённое переведут файлы сами.
+        """
+        seen = set()
+        pending: List[str] = []
+        for s in texts:
+            _lead, core, _trail = _split_outer_ws(s)
+            if not core or core in seen or not self._wants_llm(core):
+                continue
+            seen.add(core)
+            if self._cache.get(core) is None:
+                pending.append(core)
+
+        futures = [
+            executor.submit(self._translate_batch, batch, {})
+            for batch in _make_batches(pending)
+        ]
+        for fut in as_completed(futures):
+            try:
+                fut.result()
+            except Exception as e:
+                logger.warning("[WARMUP] Batch failed: %s", e)
+        return len(pending)
+
+    def _translate_batch(self, batch: List[str], done: Dict[str, str]) -> None:
+        results = None
+        if len(batch) > 1:
+            try:
+                results = self._call_llm_batch(batch)
+            except ExceedContextSizeError:
+                # пакет не влез в контекст сервера — делим пополам
+                mid = len(batch) // 2
+                logger.info(
+                    "[LLM] Batch of %d exceeds context, splitting", len(batch)
+                )
+                self._translate_batch(batch[:mid], done)
+                self._translate_batch(batch[mid:], done)
+                return
+        if results is None:
+            for s in batch:
+                done[s] = self.translate_string(s)
+            return
+        for s, t in zip(batch, results):
+            self._cache.put(s, t)
+            self._log_glossary_pair(s, t)
+            done[s] = t
 
     def translate(self, text: str) -> str:
         """
@@ -0,0 +1,101 @@
+# core/translation_cache.py
+from __future__ import annotations
+
+import hashlib
+import sqlite3
+import sys
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+
+@dataclass
+class TranslationCache:
+    """
+    Кэш переводов строк: LRU в памяти + sqlite на диске.
+
+    Ключ — blake2b(namespace + "\\0" + text), 16 байт: в памяти сам digest
+    (исходный текст в кэше не хранится), на диске — его hex. StringTranslator
+    кладёт в namespace модель и system prompt, поэтому смена модели, языков
+    или промта автоматически даёт новые ключи.
+    Переводы интернируются: одинаковые значения делят одну строку.
+    Повторный прогон по тому же проекту не ходит в LLM за уже переведённым.
+    path=None — только память (без sqlite).
+    """
+
+    path: Optional[Path]
+    namespace: str  # модель + system prompt
+    max_entries: int = 50_000
+
+    def __post_init__(self) -> None:
+        self._lock = threading.Lock()
+        self._mem: "OrderedDict[bytes, str]" = OrderedDict()
+        # префикс namespace + "\0" хэшируем один раз, на ключ — copy() + текст
+        self._ns_hash = hashlib.blake2b(
+            (self.namespace + "\0").encode("utf-8"), digest_size=16
+        )
+
+        self._db: Optional[sqlite3.Connection] = None
+        if self.path is None:
+            return
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS translations "
+            "(key TEXT PRIMARY KEY, value TEXT NOT NULL)"
+        )
+        self._db.commit()
+
+    def _key(self, text: str) -> bytes:
+        h = self._ns_hash.copy()
+        h.update(text.encode("utf-8"))
+        return h.digest()
+
+    def get(self, text: str) -> Optional[str]:
+        key = self._key(text)  # хэшируем вне блокировки
+        with self._lock:
+            value = self._mem.get(key)
+            if value is not None:
+                self._mem.move_to_end(key)
+                return value
+            if self._db is None:
+                return None
+
+            row = self._db.execute(
+                "SELECT value FROM translations WHERE key = ?",
+                (key.hex(),),
+            ).fetchone()
+            if row is None:
+                return None
+            return self._remember(key, row[0])
+
+    def put(self, text: str, translated: str) -> None:
+        key = self._key(text)
+        with self._lock:
+            translated = self._remember(key, translated)
+            if self._db is None:
+                return
+            self._db.execute(
+                "INSERT OR REPLACE INTO translations (key, value) VALUES (?, ?)",
+                (key.hex(), translated),
+            )
+            self._db.commit()
+
+    def _remember(self, key: bytes, translated: str) -> str:
+        translated = sys.intern(translated)
+        self._mem[key] = translated
+        self._mem.move_to_end(key)
+        if len(self._mem) > self.max_entries:
+            self._mem.popitem(last=False)
+        return translated
+
+    def close(self) -> None:
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
@@ -2,25 +2,156 @@
 from __future__ import annotations
 
 import logging
+import re
 from dataclasses import dataclass
-from typing import Optional, List
+from typing import Dict, Optional, List, Tuple
 
 from core.string_translator import StringTranslator
 
 
-def _is_escaped(source: str, idx: int) -> bool:
+# Символы, с которых может начаться литерал/комментарий. Остальной код
+# пропускаем одним поиском regex (цикл на C) вместо шага по символу.
+_CODE_STOP = re.compile(r"[\"'/]")
+
+# Тело литерала до закрывающей кавычки включительно: пары \x съедаются целиком,
+# поэтому кавычка после нечётного числа \ не закрывает литерал (чётность
+# обратных слешей без обратного прохода по тексту). Развёрнутая форма
+# [^q\\]*(?:\\.[^q\\]*)* без вложенного бэктрекинга.
+_STRING_BODY = re.compile(r'[^"\\]*(?:\\.[^"\\]*)*"', re.S)
+_CHAR_BODY = re.compile(r"[^'\\]*(?:\\.[^'\\]*)*'", re.S)
+
+# Виды атомов, которые отдаёт scan_java_atoms (совпадают с режимами лексера)
+ATOM_STRING = 1
+ATOM_LINE_COMMENT = 3
+ATOM_BLOCK_COMMENT = 4
+
+# (kind, start, end): text[start:end] — содержимое литерала/комментария без
+# разделителей; всё между атомами — код, копируется как есть
+JavaAtom = Tuple[int, int, int]
+
+
+def scan_java_atoms(text: str) -> List[JavaAtom]:
     """
-    Проверяет, экранирован ли символ source[idx] обратными слешами слева.
-    Пример:  a = "foo\\\"bar"
-                        ^
-    Для этой кавычки вернём True.
+    Лексер Java-исходника в один проход слева направо.
+
+    Возвращает переводимые участки: содержимое строковых литералов "...",
+    // и /* */ (/** */) комментариев. Char-литералы, незакрытые строки и
+    незакрытые блок-комментарии атомов не дают — остаются как есть.
+    Для // в CRLF-файлах \r в атом не входит.
+    Пустые участки не возвращаются.
     """
-    backslashes = 0
-    j = idx - 1
-    while j >= 0 and source[j] == "\\":
-        backslashes += 1
-        j -= 1
-    return (backslashes % 2) == 1
+    NORMAL = 0
+    STRING = ATOM_STRING
+    CHAR = 2
+    LINE_COMMENT = ATOM_LINE_COMMENT
+    BLOCK_COMMENT = ATOM_BLOCK_COMMENT
+
+    atoms: List[JavaAtom] = []
+    mode = NORMAL
+    i = 0
+    n = len(text)
+    code_stop = _CODE_STOP.search
+
+    while i < n:
+        # ---------------- NORMAL CODE ----------------
+        if mode == NORMAL:
+            m = code_stop(text, i)
+            if m is None:
+                break
+            i = m.start()
+            ch = text[i]
+
+            # начало строкового литерала
+            if ch == '"':
+                mode = STRING
+                i += 1
+                continue
+
+            # начало char-литерала
+            if ch == "'":
+                mode = CHAR
+                i += 1
+                continue
+
+            # '/': следующий символ смотрим один раз (срез безопасен на конце
+            # текста) — вместо двух проверок ch == "/" and i + 1 < n and ...
+            nxt = text[i + 1 : i + 2]
+
+            # начало // комментария
+            if nxt == "/":
+                mode = LINE_COMMENT
+                i += 2
+                continue
+
+            # начало /* или /** комментария
+            if nxt == "*":
+                mode = BLOCK_COMMENT
+                i += 2
+                # Javadoc /** – дополнительная * относится к разделителю
+                if i < n and text[i] == "*":
+                    i += 1
+                continue
+
+            # одиночный / (деление) — обычный код
+            i += 1
+            continue
+
+        # Внутри литералов/комментариев не идём посимвольно: ищем
+        # терминатор через regex/str.find (цикл на C).
+
+        # ---------------- STRING LITERAL ----------------
+        if mode == STRING:
+            m = _STRING_BODY.match(text, i)
+            if m is None:
+                # незакрытая строка — не трогаем, небезопасно
+                break
+            j = m.end() - 1
+            if j > i:
+                atoms.append((STRING, i, j))
+            mode = NORMAL
+            i = j + 1
+            continue
+
+        # ---------------- CHAR LITERAL ----------------
+        if mode == CHAR:
+            # char-литералы не переводим — просто пропускаем до закрывающей '
+            m = _CHAR_BODY.match(text, i)
+            if m is None:
+                break
+            j = m.end() - 1
+            mode = NORMAL
+            i = j + 1
+            continue
+
+        # ---------------- LINE COMMENT ----------------
+        if mode == LINE_COMMENT:
+            j = text.find("\n", i)
+            if j == -1:
+                # файл закончился внутри // комментария
+                if n > i:
+                    atoms.append((LINE_COMMENT, i, n))
+                break
+            # CRLF: \r не отдаём в LLM
+            end = j - 1 if j > i and text[j - 1] == "\r" else j
+            if end > i:
+                atoms.append((LINE_COMMENT, i, end))
+            mode = NORMAL
+            i = j + 1
+            continue
+
+        # ---------------- BLOCK COMMENT ----------------
+        if mode == BLOCK_COMMENT:
+            j = text.find("*/", i)
+            if j == -1:
+                # незакрытый /* ... – не трогаем, чтобы не сломать файл
+                break
+            if j > i:
+                atoms.append((BLOCK_COMMENT, i, j))
+            mode = NORMAL
+            i = j + 2
+            continue
+
+    return atoms
 
 
 @dataclass
@@ -40,164 +171,96 @@ class JavaTranslator:
         """
         Основной метод перевода Java-исходника.
 
+        Лексика — в scan_java_atoms(); здесь только перевод атомов через
+        StringTranslator и сборка результата (код между атомами — как есть).
+
         :param text: полный текст Java-файла
         :param file_label: относительный путь для логов (опционально)
         :return: текст с переведёнными строками и комментариями
         """
         label = file_label or "<java>"
-        self.logger.info(
-            f"[JAVA] Translating {label} (len={len(text)} chars)"
-        )
+        self.logger.info("[JAVA] Translating %s (len=%d chars)", label, len(text))
+
+        atoms = scan_java_atoms(text)
 
-        NORMAL = 0
-        STRING = 1
-        CHAR = 2
-        LINE_COMMENT = 3
-        BLOCK_COMMENT = 4
-
-        mode = NORMAL
-        result: List[str] = []
-        buf: List[str] = []  # для содержимого строк/комментов
-
-        i = 0
-        n = len(text)
-
-        def translate_buffer(kind: str) -> str:
-            """
-            kind: 'string' или 'comment'
-            Через StringTranslator переводим только содержимое,
-            а кавычки/делимтеры остаются снаружи.
-            """
-            nonlocal buf
-            inner = "".join(buf)
-            buf = []
-            if not inner:
-                return ""
+        # Проход 1: режем текст один раз в parts = [код, атом, код, ..., код]
+        # (размер известен заранее: 2 * атомов + 1) и собираем уникальные
+        # непустые атомы ("OK", теги логов, одинаковые комменты — один раз)
+        # для одного вызова translate_many вместо запроса на каждый атом.
+        parts: List[str] = [""] * (2 * len(atoms) + 1)
+        seen: Dict[str, str] = {}
+        pos = 0
+        k = 0
+        for _kind, start, end in atoms:
+            parts[k] = text[pos:start]
+            inner = parts[k + 1] = text[start:end]
+            if inner not in seen and not inner.isspace():
+                seen[inner] = inner
+            pos = end
+            k += 2
+        parts[k] = text[pos:]
 
+        if seen:
             try:
-                translated = self.string_translator.translate_string(inner)
-                return translated
+                uniq = list(seen)
+                for inner, done in zip(
+                    uniq, self.string_translator.translate_many(uniq)
+                ):
+                    seen[inner] = done
             except Exception as e:
-                self.logger.error(
-                    f"[JAVA] Error translating {kind} in {label}: {e}"
+                self.logger.warning(
+                    "[JAVA] Batch translation failed for %s: %s; "
+                    "falling back to per-atom",
+                    label,
+                    e,
                 )
-                # В случае ошибки безопаснее оставить исходное содержимое
-                return inner
-
-        while i < n:
-            ch = text[i]
-
-            # ---------------- NORMAL CODE ----------------
-            if mode == NORMAL:
-                # начало строкового литерала
-                if ch == '"':
-                    mode = STRING
-                    buf = []
-                    result.append('"')
-                    i += 1
-                    continue
+                self._translate_each(text, atoms, seen, label)
 
-                # начало char-литерала
-                if ch == "'":
-                    mode = CHAR
-                    result.append("'")
-                    i += 1
-                    continue
-
-                # начало // комментария
-                if ch == "/" and i + 1 < n and text[i + 1] == "/":
-                    mode = LINE_COMMENT
-                    buf = []
-                    result.append("//")
-                    i += 2
-                    continue
-
-                # начало /* или /** комментария
-                if ch == "/" and i + 1 < n and text[i + 1] == "*":
-                    mode = BLOCK_COMMENT
-                    buf = []
-                    result.append("/*")
-                    i += 2
-                    # Javadoc /** – копируем дополнительную *
-                    if i < n and text[i] == "*":
-                        result.append("*")
-                        i += 1
-                    continue
-
-                # обычный код
-                result.append(ch)
-                i += 1
-                continue
-
-            # ---------------- STRING LITERAL ----------------
-            if mode == STRING:
-                if ch == '"' and not _is_escaped(text, i):
-                    # закрытие строки
-                    translated_inner = translate_buffer("string")
-                    result.append(translated_inner)
-                    result.append('"')
-                    mode = NORMAL
-                    i += 1
-                    continue
-                else:
-                    buf.append(ch)
-                    i += 1
-                    continue
-
-            # ---------------- CHAR LITERAL ----------------
-            if mode == CHAR:
-                # char-литералы не переводим — просто копируем до закрывающей '
-                result.append(ch)
-                # закрытие char-литерала неэкранированной кавычкой
-                if ch == "'" and not _is_escaped(text, i):
-                    mode = NORMAL
-                i += 1
-                continue
+        # Проход 2: подставляем переводы в нечётные слоты на месте
+        # (пробельные атомы в seen не попали и остаются как были)
+        get = seen.get
+        parts[1::2] = [get(inner, inner) for inner in parts[1::2]]
 
-            # ---------------- LINE COMMENT ----------------
-            if mode == LINE_COMMENT:
-                if ch == "\n":
-                    # конец комментария — переводим накопленное
-                    translated_inner = translate_buffer("comment")
-                    result.append(translated_inner)
-                    result.append("\n")
-                    mode = NORMAL
-                    i += 1
-                    continue
-                else:
-                    buf.append(ch)
-                    i += 1
-                    continue
-
-            # ---------------- BLOCK COMMENT ----------------
-            if mode == BLOCK_COMMENT:
-                if ch == "*" and i + 1 < n and text[i + 1] == "/":
-                    # конец /* ... */
-                    translated_inner = translate_buffer("comment")
-                    result.append(translated_inner)
-                    result.append("*/")
-                    mode = NORMAL
-                    i += 2
-                    continue
-                else:
-                    buf.append(ch)
-                    i += 1
-                    continue
-
-        # Хвостовые ситуации:
-        if mode == LINE_COMMENT:
-            # файл закончился внутри // комментария
-            translated_inner = translate_buffer("comment")
-            result.append(translated_inner)
-        elif mode == BLOCK_COMMENT:
-            # незакрытый /* ... – не трогаем, чтобы не сломать файл
-            result.extend(buf)
-        elif mode == STRING:
-            # незакрытая строка — тоже не трогаем, небезопасно
-            result.extend(buf)
-
-        out = "".join(result)
+        out = "".join(parts)
         self.logger.info(
-            f"[JAVA] Done {label}: {len(text)} -> {len(out)} chars"
+            "[JAVA] Done %s: %d -> %d chars", label, len(text), len(out)
         )
         return out
+
+    def collect_strings(self, text: str) -> List[str]:
+        """
+        Уникальные непустые атомы файла в порядке появления, без перевода —
+        для прогрева кэша StringTranslator.warm_cache до обработки файлов.
+        """
+        seen: Dict[str, None] = {}
+        for _kind, start, end in scan_java_atoms(text):
+            inner = text[start:end]
+            if not inner.isspace():
+                seen.setdefault(inner, None)
+        return list(seen)
+
+    def _translate_each(
+        self,
+        text: str,
+        atoms: List[JavaAtom],
+        seen: Dict[str, str],
+        label: str,
+    ) -> None:
+        """Запасной путь: каждый уникальный атом отдельным translate_string."""
+        tried = set()
+        for kind, start, end in atoms:
+            inner = text[start:end]
+            if inner not in seen or inner in tried:
+                continue
+            tried.add(inner)
+            try:
+                seen[inner] = self.string_translator.translate_string(inner)
+            except Exception as e:
+                self.logger.error(
+                    "[JAVA] Error translating %s in %s: %s",
+                    "string" if kind == ATOM_STRING else "comment",
+                    label,
+                    e,
+                )
+                # В случае ошибки безопаснее оставить исходное содержимое
+                seen[inner] = inner
@@ -1,21 +1,27 @@
 # qa_report.py
 from __future__ import annotations
 
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass, fields
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Set
 
 import json
 import re
+import threading
 
+try:
+    import hyperscan  # type: ignore
+except ImportError:  # необязательное ускорение _check_banned (SIMD multi-pattern)
+    hyperscan = None
 
-@dataclass
+
+@dataclass(frozen=True, slots=True)
 class QaIssue:
     code: str
     message: str
 
 
-@dataclass
+@dataclass(slots=True)
 class QaCheckResult:
     status: str  # "ok" | "warn" | "fail"
     issues: List[QaIssue]
@@ -39,6 +45,50 @@ BANNED_SUBSTRINGS = [
 ]
 
 
+# Один проход по тексту вместо отдельного `in` на каждый токен.
+# Токены не являются подстроками друг друга, поэтому alternation
+# не прячет пересекающиеся совпадения.
+_BANNED_RE = re.compile("|".join(re.escape(t) for t in BANNED_SUBSTRINGS))
+
+
+# Hyperscan: все токены в одной литеральной БД, SINGLEMATCH — по одному
+# событию на токен. Регистр учитываем, как и regex-вариант.
+_HS_DB = None
+if hyperscan is not None:
+    _HS_DB = hyperscan.Database()
+    _HS_DB.compile(
+        expressions=[t.encode("utf-8") for t in BANNED_SUBSTRINGS],
+        ids=list(range(len(BANNED_SUBSTRINGS))),
+        elements=len(BANNED_SUBSTRINGS),
+        flags=hyperscan.HS_FLAG_SINGLEMATCH,
+        literal=True,
+    )
+# scratch-память hyperscan нельзя делить между одновременными сканами
+_hs_tls = threading.local()
+
+
+def _on_banned_match(
+    id_: int, start: int, end: int, flags: int, found: Set[str]
+) -> None:
+    found.add(BANNED_SUBSTRINGS[id_])
+
+
+def _find_banned(text: str) -> Set[str]:
+    if _HS_DB is None:
+        return {m.group(0) for m in _BANNED_RE.finditer(text)}
+    scratch = getattr(_hs_tls, "scratch", None)
+    if scratch is None:
+        scratch = _hs_tls.scratch = hyperscan.Scratch(_HS_DB)
+    found: Set[str] = set()
+    _HS_DB.scan(
+        text.encode("utf-8"),
+        match_event_handler=_on_banned_match,
+        context=found,
+        scratch=scratch,
+    )
+    return found
+
+
 CRITICAL_ISSUES = {
     "empty_translation",
     "banned_token",
@@ -48,8 +98,12 @@ CRITICAL_ISSUES = {
 
 def _check_banned(text: str) -> List[QaIssue]:
     issues: List[QaIssue] = []
+    found = _find_banned(text)
+    if not found:
+        return issues
+    # по одному issue на токен, в порядке BANNED_SUBSTRINGS — как раньше
     for token in BANNED_SUBSTRINGS:
-        if token in text:
+        if token in found:
             issues.append(
                 QaIssue(
                     code="banned_token",
@@ -59,10 +113,26 @@ def _check_banned(text: str) -> List[QaIssue]:
     return issues
 
 
+# Непустое "предложение": от первого видимого символа до [.!?] — по одному
+# совпадению на каждый кусок re.split(r"[.!?]+"), в котором есть не-пробел.
+# (Не \S: он совпадает и с самой точкой.)
+_SENT_RE = re.compile(r"[^.!?\s][^.!?]*")
+
+
 def _sentence_count(s: str) -> int:
-    # Очень грубо, но для sanity достаточно
-    parts = re.split(r"[.!?]+", s)
-    return sum(1 for p in parts if p.strip())
+    # Очень грубо, но для sanity достаточно; считаем без копий кусков строки
+    return sum(1 for _ in _SENT_RE.finditer(s))
+
+
+def _make_result(issues: List[QaIssue], details: Dict[str, Any]) -> QaCheckResult:
+    # одинаковые (code, message) — один раз; QaIssue frozen, порядок сохраняем
+    issues = list(dict.fromkeys(issues))
+    status = "ok"
+    if any(i.code in CRITICAL_ISSUES for i in issues):
+        status = "fail"
+    elif issues:
+        status = "warn"
+    return QaCheckResult(status=status, issues=issues, details=details)
 
 
 # --- plain string ---------------------------------------------------------
@@ -101,22 +171,30 @@ def qa_plain_string(
             )
         )
 
-    status = "ok"
-    if any(i.code in CRITICAL_ISSUES for i in issues):
-        status = "fail"
-    elif issues:
-        status = "warn"
-
-    return QaCheckResult(status=status, issues=issues, details=details)
+    return _make_result(issues, details)
 
 
 # --- Java skeletal comparison ---------------------------------------------
 
+# код между литералами/комментариями копируем срезом до следующего / " '
+_CODE_STOP = re.compile(r"[\"'/]")
+# конец // комментария: первый \r или \n
+_LINE_END = re.compile(r"[\r\n]")
+# тела литералов до закрывающей кавычки включительно, пары \x целиком —
+# вместо посимвольного цикла с флагом escaped (тот же результат)
+_STRING_BODY = re.compile(r'[^"\\]*(?:\\.[^"\\]*)*"', re.S)
+_CHAR_BODY = re.compile(r"[^'\\]*(?:\\.[^'\\]*)*'", re.S)
+# Маркеры литерала/коммента в скелете. Скелет нужен только для сравнения на
+# равенство, поэтому без номеров (__STRi__ давал f-строку на каждый атом):
+# номера лишь повторяли порядок маркеров. \0 в Java-исходнике не встречается.
+_STR_MARK = "\0S"
+_CMT_MARK = "\0C"
+
 
 def _mask_java_skeleton(text: str) -> tuple[str, int, int]:
     """
     Возвращает:
-      - skeleton: строка, где строки/комменты заменены на маркеры __STRi__/__CMTj__
+      - skeleton: строка, где строки/комменты заменены на маркеры _STR_MARK/_CMT_MARK
       - count_strings
       - count_comments
     """
@@ -125,17 +203,24 @@ def _mask_java_skeleton(text: str) -> tuple[str, int, int]:
     out: List[str] = []
     str_count = 0
     cmt_count = 0
+    code_stop = _CODE_STOP.search
 
     while i < n:
+        m = code_stop(text, i)
+        j = n if m is None else m.start()
+        if j > i:
+            out.append(text[i:j])
+            i = j
+            if i >= n:
+                break
         ch = text[i]
 
         # line comment
         if ch == "/" and i + 1 < n and text[i + 1] == "/":
-            out.append(f"__CMT{cmt_count}__")
+            out.append(_CMT_MARK)
             cmt_count += 1
-            i += 2
-            while i < n and text[i] not in "\r\n":
-                i += 1
+            m = _LINE_END.search(text, i + 2)
+            i = n if m is None else m.start()
             if i < n:
                 out.append(text[i])  # перенос строки
                 i += 1
@@ -143,7 +228,7 @@ def _mask_java_skeleton(text: str) -> tuple[str, int, int]:
 
         # block comment
         if ch == "/" and i + 1 < n and text[i + 1] == "*":
-            out.append(f"__CMT{cmt_count}__")
+            out.append(_CMT_MARK)
             cmt_count += 1
             i += 2
             end = text.find("*/", i)
@@ -154,45 +239,18 @@ def _mask_java_skeleton(text: str) -> tuple[str, int, int]:
 
         # string literal
         if ch == '"':
-            out.append(f"__STR{str_count}__")
+            out.append(_STR_MARK)
             str_count += 1
-            i += 1
-            escaped = False
-            while i < n:
-                c = text[i]
-                if escaped:
-                    escaped = False
-                    i += 1
-                    continue
-                if c == "\\":
-                    escaped = True
-                    i += 1
-                    continue
-                if c == '"':
-                    i += 1
-                    break
-                i += 1
+            # незакрытая строка съедает хвост файла
+            m = _STRING_BODY.match(text, i + 1)
+            i = n if m is None else m.end()
             continue
 
         # char literal — пропускаем как обычный символ, менять не должны
         if ch == "'" and i + 1 < n:
             out.append("'")
-            i += 1
-            escaped = False
-            while i < n:
-                c = text[i]
-                if escaped:
-                    escaped = False
-                    i += 1
-                    continue
-                if c == "\\":
-                    escaped = True
-                    i += 1
-                    continue
-                if c == "'":
-                    i += 1
-                    break
-                i += 1
+            m = _CHAR_BODY.match(text, i + 1)
+            i = n if m is None else m.end()
             out.append("'")
             continue
 
@@ -245,17 +303,14 @@ def qa_code_java(orig: str, translated: str) -> QaCheckResult:
 
     issues.extend(_check_banned(translated))
 
-    status = "ok"
-    if any(i.code in CRITICAL_ISSUES for i in issues):
-        status = "fail"
-    elif issues:
-        status = "warn"
-
-    return QaCheckResult(status=status, issues=issues, details=details)
+    return _make_result(issues, details)
 
 
 # --- запись отчёта --------------------------------------------------------
 
+# поля QaIssue один раз: asdict() рефлексивен и делает deepcopy на каждый issue
+_QA_ISSUE_FIELDS = tuple(f.name for f in fields(QaIssue))
+
 
 def write_report(result: SanityResult, output_root: Path) -> Path:
     out_dir = output_root / "_translation_logs"
@@ -266,7 +321,10 @@ def write_report(result: SanityResult, output_root: Path) -> Path:
     for name, check in result.items():
         serializable[name] = {
             "status": check.status,
-            "issues": [asdict(i) for i in check.issues],
+            "issues": [
+                {f: getattr(i, f) for f in _QA_ISSUE_FIELDS}
+                for i in check.issues
+            ],
             "details": check.details,
         }
 
@@ -1,15 +1,18 @@
 # sanity_check.py
 from __future__ import annotations
 
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 import logging
-from typing import Dict
+from typing import Optional
 
-from llm_client import BaseLLMClient
-from stats import Stats
-from string_translator import StringTranslator
+from core.file_router import read_utf8
+from core.llm_client import BaseLLMClient
+from core.stats import Stats
+from core.string_translator import StringTranslator
 from java_translator import JavaTranslator
 from qa_report import (
+    QaCheckResult,
     SanityResult,
     qa_plain_string,
     qa_code_java,
@@ -43,35 +46,55 @@ def run_all(
         glossary_path=glossary_path,
     )
 
+    # Проверки независимы и упираются в LLM (requests отпускает GIL на
+    # сетевом вызове) — гоняем STRING и JAVA параллельно.
+
     # --- STRING -----------------------------------------------------------
 
-    txt_path = tests_dir / "sanity_check.txt"
-    if txt_path.exists():
+    def check_string() -> Optional[QaCheckResult]:
+        txt_path = tests_dir / "sanity_check.txt"
+        if not txt_path.exists():
+            logger.warning(f"[SANITY] Missing {txt_path}, skipping string sanity check.")
+            return None
         logger.info(f"[SANITY] String check using {txt_path}")
         orig = txt_path.read_text(encoding="utf-8").strip()
         translated = string_translator.translate_string(orig)
-        r = qa_plain_string(orig, translated, source_lang, target_lang)
-        result["string_simple"] = r
-    else:
-        logger.warning(f"[SANITY] Missing {txt_path}, skipping string sanity check.")
+        return qa_plain_string(orig, translated, source_lang, target_lang)
 
     # --- JAVA -------------------------------------------------------------
 
-    java_path = tests_dir / "sanity_check.java"
-    if java_path.exists():
+    def check_java() -> Optional[QaCheckResult]:
+        java_path = tests_dir / "sanity_check.java"
+        if not java_path.exists():
+            logger.warning(f"[SANITY] Missing {java_path}, skipping Java sanity check.")
+            return None
         logger.info(f"[SANITY] Java check using {java_path}")
-        orig_java = java_path.read_text(encoding="utf-8")
+        # как в пайплайне (translate_java_file): байты как есть, CRLF не
+        # переводится в LF, без промежуточного bytes на каждое чтение
+        orig_java = read_utf8(java_path)
 
         java_translator = JavaTranslator(
             string_translator=string_translator,
-            stats=stats,
             logger=logger,
         )
-        translated_java = java_translator.translate_text(orig_java)
-        r_java = qa_code_java(orig_java, translated_java)
-        result["java_file"] = r_java
-    else:
-        logger.warning(f"[SANITY] Missing {java_path}, skipping Java sanity check.")
+        translated_java = java_translator.translate(
+            orig_java, file_label=java_path.name
+        )
+        return qa_code_java(orig_java, translated_java)
+
+    try:
+        with ThreadPoolExecutor(max_workers=2) as ex:
+            fut_string = ex.submit(check_string)
+            fut_java = ex.submit(check_java)
+            # порядок ключей в отчёте — как раньше: сначала строка, потом Java
+            r = fut_string.result()
+            if r is not None:
+                result["string_simple"] = r
+            r_java = fut_java.result()
+            if r_java is not None:
+                result["java_file"] = r_java
+    finally:
+        string_translator.close()
 
     # --- summary + запись отчёта -----------------------------------------
 
@@ -3,24 +3,52 @@ from __future__ import annotations
 import argparse
 import json
 import logging
+import os
 import sys
 import tempfile
 import time
 import zipfile
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    Executor,
+    Future,
+    ThreadPoolExecutor,
+    wait,
+)
 from pathlib import Path
-from typing import List
-
-from tqdm import tqdm
+from typing import Callable, Dict, Iterator, List, Tuple
 
 from core.llm_client import LlamaCppClient, OllamaClient, BaseLLMClient
 from core.logging_setup import setup_logger
 from core.stats import Stats
 from core.string_translator import StringTranslator
-from core.file_router import route_and_process_file
+from core.file_router import (
+    copy_passthrough_file,
+    ensure_output_dirs,
+    partition_files,
+    read_utf8,
+    scan_existing_outputs,
+    translate_java_file,
+)
 from java_translator import JavaTranslator
 
 
+# Воркеры в основном ждут LLM/диск, а не CPU. Реальную нагрузку на сервер
+# ограничивает --max-parallel-requests, а не число потоков.
+DEFAULT_WORKERS = min(32, (os.cpu_count() or 1) * 5)
+
+
+def _positive_int(value: str) -> int:
+    """argparse type: целое >= 1 (0 ломает пулы потоков и семафор клиента)."""
+    try:
+        n = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected an integer, got {value!r}")
+    if n < 1:
+        raise argparse.ArgumentTypeError(f"must be >= 1, got {n}")
+    return n
+
+
 def parse_args() -> argparse.Namespace:
     parser = argparse.ArgumentParser(
         description=(
@@ -61,9 +89,37 @@ def parse_args() -> argparse.Namespace:
     )
     parser.add_argument(
         "--workers",
-        type=int,
+        type=_positive_int,
+        default=DEFAULT_WORKERS,
+        help=(
+            "Number of parallel file worker threads "
+            f"(default: min(32, 5 * CPUs) = {DEFAULT_WORKERS})."
+        ),
+    )
+    parser.add_argument(
+        "--max-parallel-requests",
+        type=_positive_int,
         default=4,
-        help="Number of parallel worker threads.",
+        help=(
+            "Max concurrent LLM requests; match llama.cpp --parallel / "
+            "OLLAMA_NUM_PARALLEL."
+        ),
+    )
+    parser.add_argument(
+        "--no-prewarm",
+        action="store_true",
+        help=(
+            "Skip the project-wide pre-pass that translates unique strings "
+            "of all .java files before processing them."
+        ),
+    )
+    parser.add_argument(
+        "--no-lang-shortcut",
+        action="store_true",
+        help=(
+            "Send every string to the LLM, even if it is already written in "
+            "the target language's script."
+        ),
     )
     parser.add_argument(
         "--source-lang",
@@ -99,19 +155,89 @@ def prepare_input(input_path: Path, logger: logging.Logger) -> Path:
 
 
 def iter_project_files(root: Path) -> List[Path]:
-    """Return list of all files (relative paths) under root."""
+    """
+    Return list of all files (relative paths) under root.
+
+    os.scandir вместо rglob + is_file: тип берётся из DirEntry (без stat на
+    каждый путь), относительный путь собирается по ходу обхода, без
+    relative_to. Как и rglob, в симлинки на каталоги не заходим и молча
+    пропускаем каталоги без прав на чтение.
+    """
     files: List[Path] = []
-    for p in root.rglob("*"):
-        if p.is_file():
-            files.append(p.relative_to(root))
+    stack = [(str(root), Path())]
+    while stack:
+        abs_dir, rel_dir = stack.pop()
+        try:
+            it = os.scandir(abs_dir)
+        except PermissionError:
+            continue
+        with it:
+            for entry in it:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append((entry.path, rel_dir / entry.name))
+                elif entry.is_file():
+                    files.append(rel_dir / entry.name)
     return files
 
 
+def prewarm_strings(
+    src_root: Path,
+    java_files: List[Path],
+    java_translator: JavaTranslator,
+    string_translator: StringTranslator,
+    executor: Executor,
+    logger: logging.Logger,
+) -> None:
+    """
+    Пре-проход по всему проекту: уникальные строки/комменты всех .java
+    переводятся пакетами один раз до обработки файлов, сами файлы потом
+    берут переводы из кэша. Ошибки чтения не фатальны — файл разберётся сам.
+    """
+
+    def collect(rel_path: Path) -> List[str]:
+        try:
+            return java_translator.collect_strings(read_utf8(src_root / rel_path))
+        except Exception as e:
+            logger.warning("[WARMUP] Cannot read %s: %s", rel_path, e)
+            return []
+
+    uniq: Dict[str, None] = {}
+    for strings in executor.map(collect, java_files):
+        uniq.update(dict.fromkeys(strings))
+
+    t0 = time.time()
+    sent = string_translator.warm_cache(uniq, executor)
+    logger.info(
+        "[WARMUP] %d files, %d unique strings, %d sent to LLM in %.1fs",
+        len(java_files),
+        len(uniq),
+        sent,
+        time.time() - t0,
+    )
+
+
+def sort_longest_first(root: Path, rel_paths: List[Path]) -> None:
+    """
+    Крупные файлы — вперёд (LPT-расписание): иначе самый большой .java,
+    попавшийся в конце обхода, дорабатывает один, пока остальные воркеры
+    простаивают. Недоступный файл считаем пустым — ошибку покажет воркер.
+    """
+
+    def size(rel: Path) -> int:
+        try:
+            return os.stat(root / rel).st_size
+        except OSError:
+            return 0
+
+    rel_paths.sort(key=size, reverse=True)
+
+
 def build_llm_client(args: argparse.Namespace, logger: logging.Logger) -> BaseLLMClient:
     if args.backend == "llama":
         client: BaseLLMClient = LlamaCppClient(
             url=args.llama_url,
             model=args.model,
+            pool_size=args.max_parallel_requests,
         )
         logger.info(f"Backend: llama.cpp url={args.llama_url} model={args.model}")
         return client
@@ -127,6 +253,7 @@ def build_llm_client(args: argparse.Namespace, logger: logging.Logger) -> BaseLL
         url=args.ollama_url,
         model=args.model,
         options=options,
+        pool_size=args.max_parallel_requests,
     )
     logger.info(
         f"Backend: ollama url={args.ollama_url} model={args.model} options={options}"
@@ -145,7 +272,10 @@ def main() -> None:
 
     logger.info(f"Input:  {input_path}")
     logger.info(f"Output: {output_root}")
-    logger.info(f"Backend: {args.backend}, model={args.model}, workers={args.workers}")
+    logger.info(
+        f"Backend: {args.backend}, model={args.model}, workers={args.workers}, "
+        f"max_parallel_requests={args.max_parallel_requests}"
+    )
     logger.info(f"Lang: {args.source_lang} → {args.target_lang}")
 
     client = build_llm_client(args, logger)
@@ -163,6 +293,8 @@ def main() -> None:
         target_lang=args.target_lang,
         stats=stats,
         glossary_path=glossary_path,
+        cache_path=output_root / "_translation_cache" / "strings.sqlite3",
+        lang_shortcut=not args.no_lang_shortcut,
     )
 
     java_translator = JavaTranslator(
@@ -177,43 +309,117 @@ def main() -> None:
 
     files = iter_project_files(src_root)
     logger.info(f"Discovered {len(files)} files to process.")
+    existing_outputs = scan_existing_outputs(output_root)
+    if existing_outputs:
+        logger.info(f"[RESUME] Found {len(existing_outputs)} existing output files.")
+    ensure_output_dirs(output_root, files)
+    java_files, other_files = partition_files(files)
+    sort_longest_first(src_root, java_files)
+    logger.info(
+        f"Java files: {len(java_files)}, passthrough files: {len(other_files)}"
+    )
 
     start_time = time.time()
 
-    def worker(rel_path: Path) -> None:
-        logger.info(f"[FILE] Start: {rel_path}")
-        route_and_process_file(
+    def java_worker(rel_path: Path) -> None:
+        logger.info("[FILE] Start: %s", rel_path)
+        translate_java_file(
             src_root=src_root,
             dst_root=output_root,
             rel_path=rel_path,
             java_translator=java_translator,
-            #string_translator=string_translator,
             stats=stats,
             logger=logger,
+            existing_outputs=existing_outputs,
+            chunk_executor=chunk_pool,
         )
-        logger.info(f"[FILE] Done:  {rel_path}")
+        logger.info("[FILE] Done:  %s", rel_path)
 
-    use_tqdm = sys.stderr.isatty()
+    def copy_worker(rel_path: Path) -> None:
+        copy_passthrough_file(
+            src_root=src_root,
+            dst_root=output_root,
+            rel_path=rel_path,
+            stats=stats,
+            logger=logger,
+            existing_outputs=existing_outputs,
+        )
 
+    use_tqdm = sys.stderr.isatty()
     if use_tqdm:
         logger.info(
             f"Progress: using tqdm over {len(files)} files, workers={args.workers}"
         )
-        with ThreadPoolExecutor(max_workers=args.workers) as pool:
-            list(
-                tqdm(
-                    pool.map(worker, files),
-                    total=len(files),
-                    desc="Translating files",
-                    unit="file",
-                )
-            )
     else:
         logger.info(
             f"Progress: no TTY detected, running without tqdm, workers={args.workers}"
         )
-        with ThreadPoolExecutor(max_workers=args.workers) as pool:
-            list(pool.map(worker, files))
+
+    # LLM-пул для .java и отдельный маленький пул для копирования,
+    # чтобы копии не ждали в очереди за переводами
+    # Третий пул — для кусков больших .java (см. JAVA_CHUNK_CHARS): ждущий
+    # воркер не должен занимать слот, в котором стоят его же куски
+    copy_workers = max(1, min(4, args.workers))
+    with ThreadPoolExecutor(max_workers=args.workers) as pool, ThreadPoolExecutor(
+        max_workers=copy_workers
+    ) as copy_pool, ThreadPoolExecutor(
+        max_workers=args.workers, thread_name_prefix="chunk"
+    ) as chunk_pool:
+        if not args.no_prewarm:
+            prewarm_strings(
+                src_root,
+                [p for p in java_files if p not in existing_outputs],
+                java_translator,
+                string_translator,
+                pool,
+                logger,
+            )
+
+        # Окно задач: в очереди каждого пула не больше 2 * его воркеров,
+        # следующий файл отправляется по мере завершения — без тысяч Future
+        # в памяти на больших проектах, копии не ждут за переводами.
+        jobs: Dict[Executor, Tuple[Callable[[Path], None], Iterator[Path]]] = {
+            pool: (java_worker, iter(java_files)),
+            copy_pool: (copy_worker, iter(other_files)),
+        }
+        inflight: Dict[Future, Tuple[Executor, Path]] = {}
+
+        def submit_next(ex: Executor) -> None:
+            worker, paths = jobs[ex]
+            rel_path = next(paths, None)
+            if rel_path is not None:
+                inflight[ex.submit(worker, rel_path)] = (ex, rel_path)
+
+        for ex, n_workers in ((pool, args.workers), (copy_pool, copy_workers)):
+            for _ in range(2 * n_workers):
+                submit_next(ex)
+
+        progress = None
+        if use_tqdm:
+            from tqdm import tqdm  # лениво: не нужен для --help и без TTY
+
+            progress = tqdm(total=len(files), desc="Translating files", unit="file")
+        try:
+            while inflight:
+                done, _ = wait(inflight, return_when=FIRST_COMPLETED)
+                for fut in done:
+                    ex, rel_path = inflight.pop(fut)
+                    try:
+                        fut.result()
+                    except Exception as e:
+                        # воркеры сами ловят ошибки IO/LLM,
+                        # сюда попадает только что-то совсем неожиданное
+                        msg = f"[ERROR] Worker crashed on {rel_path}: {e}"
+                        logger.error(msg, exc_info=True)
+                        stats.record(outcome="error", error=msg)
+                    if progress is not None:
+                        progress.update(1)
+                    submit_next(ex)
+        finally:
+            if progress is not None:
+                progress.close()
+
+    string_translator.close()
 
     wall_time = time.time() - start_time
     stats.log_summary(logger, wall_time)